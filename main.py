@@ -1,59 +1,19 @@
 import os
-import pytz
-import asyncio
-import schedule
+import sys
 import time
-from typing import List
-from supabase import Client, create_client
+import argparse
+import subprocess
 from datetime import datetime
 
-from langchain_core.messages import HumanMessage, SystemMessage
-
-from src.technical_analysis import technical_analysis
-from src.sentimental_analysis import sentimental_analysis
-from src.schemas import Report, OrderBook
-from src.utils import *
-from src.prompts import portfolio_management_system_prompt
+import pytz
 
 from src.logger import setup_logger
-from dotenv import load_dotenv
-load_dotenv()
 
+# heavy dependencies (supabase, langchain providers, binance, talib) are
+# imported inside the commands that need them to keep cold starts cheap
 
 logger = setup_logger("main", "project.log")
 
-async def async_technical_analysis(target: str, config: dict):
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, technical_analysis, target, config['technical_analysis'])
-    return result
-
-async def async_sentiment_analysis(target: str, config: dict):
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, sentimental_analysis, target, config['sentiment_analysis'])
-    return result
-
-async def generate_reports(targets: List[str], config: dict) -> List[Report]:
-    tech_tasks = [async_technical_analysis(target, config) for target in targets]
-    sentiment_tasks = [async_sentiment_analysis(target, config) for target in targets]
-    
-    # Combine both lists into a single list and run them concurrently.
-    all_tasks = tech_tasks + sentiment_tasks
-    all_results = await asyncio.gather(*all_tasks)
-
-    n = len(targets)
-    tech_results = all_results[:n]
-    sentiment_results = all_results[n:]
-
-    reports = [
-        Report(
-            name=target,
-            technical_analysis=tech,
-            sentimental_analysis=sent
-        )
-        for target, tech, sent in zip(targets, tech_results, sentiment_results)
-    ]
-    return reports
-
 def main(config):
     name = config['name']
     targets = config['target']
@@ -62,53 +22,131 @@ def main(config):
     logger.info("Current Time: %s", current_time)
     logger.info("Targets: %s", targets)
 
-    # 0. initialize the database
-    db: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    from src.schemas import OrderBook
+    from src.journal import RunJournal, cycle_id, journal_path, PORTFOLIO
+    from src.account import AccountState
+    from src.workers import distributed_reports
+    from src.paper import get_broker
+    from src.gating import skipped_calls
 
-    # 1. clear incomplete orders
-    clear_orders()
-    logger.info("Incomplete orders cleared")
+    # 0. initialize the database, the run journal and the broker (live or paper ledger)
+    paper = config.get('paper', {}).get('enabled', False)
+    if paper:
+        logger.info("Paper trading, ledger: %s", config['paper'].get('ledger', 'paper_ledger.json'))
+        db = None
+    else:
+        from supabase import Client, create_client
+        db: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    journal = RunJournal(journal_path(config))
+    cycle = cycle_id(config['technical_analysis']['data']['interval'])
+    logger.info("Cycle: %s", cycle)
+    broker = get_broker(config)
+    account = AccountState(targets, config.get('account', {}).get('ttl', 30), broker)
+
+    # 1. clear incomplete orders (only once per cycle, a resumed run must not cancel its own orders)
+    if journal.get(cycle, PORTFOLIO, 'clear_orders') is None:
+        # the snapshot taken after this skips the open orders request
+        account.clear_orders()
+        journal.put(cycle, PORTFOLIO, 'clear_orders', current_time)
+        logger.info("Incomplete orders cleared")
 
     # 1. generate technical/sentimental_analysis
-    reports = asyncio.run(generate_reports(targets, config))
+    reports = distributed_reports(targets, config, journal, cycle)
+    if len(reports) < len(targets):
+        logger.warning("Analysis incomplete for %s", sorted(set(targets) - set(r.name for r in reports)))
+    skipped = skipped_calls(journal, cycle)
+    journal.put(cycle, PORTFOLIO, 'skipped_calls', skipped)
+    logger.info("LLM calls skipped by gating: %s of %d", skipped, 2 * len(targets))
 
     for report in reports:
-        try:
-            response = (
-                db.table("analysis")
-                .insert({
-                    "name": name,
-                    'type': "technical",
-                    'content': report.technical_analysis.summary,
-                    'created': current_time,
-                    'target': report.name
-                })
-                .execute()
-            )
-        except Exception as e:
-            logger.error("Error inserting analysis: %s", e)
-        try:
-            response = (
-                db.table("analysis")
-                .insert({
-                    "name": name,
-                    'type': "sentimental",
-                    'content': report.sentimental_analysis.summary,
-                    'created': current_time,
-                    'target': report.name
-                })
-                .execute()
-            )
-        except Exception as e:
-            logger.error("Error inserting analysis: %s", e)
+        if db is None:
+            break
+        # each analysis is marked once inserted, so a rerun retries only the failed ones
+        for kind, analysis in (('technical', report.technical_analysis), ('sentimental', report.sentimental_analysis)):
+            if journal.get(cycle, report.name, f'published_{kind}') is not None:
+                continue
+            try:
+                response = (
+                    db.table("analysis")
+                    .insert({
+                        "name": name,
+                        'type': kind,
+                        'content': analysis.summary,
+                        'created': current_time,
+                        'target': report.name
+                    })
+                    .execute()
+                )
+                journal.put(cycle, report.name, f'published_{kind}', current_time)
+            except Exception as e:
+                logger.error("Error inserting analysis: %s", e)
+
+    if not reports:
+        logger.warning("No report for any target, skipping the decision")
+        return
     
-    # 2. get current portfolio
-    portfolio = get_current_portfolio(targets)
-    current_prices = get_current_prices(targets)
-    logger.info("Portfolio: %s", portfolio)
-    logger.info("Current Prices: %s", current_prices)
+    # 2. get orders: the cycle's decision is made again (with the current
+    # portfolio) only while none of its orders was executed, once it traded a
+    # rerun completes it rather than deciding from scratch
+    reported = sorted(report.name for report in reports)
+    decision = journal.get(cycle, PORTFOLIO, 'decision')
+    traded = False
+    if decision is not None:
+        orders = OrderBook.model_validate(decision['orders']).orders
+        traded = any(journal.get(cycle, PORTFOLIO, f'order_{i}') is not None for i in range(len(orders)))
+    if decision is not None and (traded or decision['targets'] == reported):
+        logger.info("Resuming decision from cycle %s", cycle)
+        undecided = sorted(set(reported) - set(decision['targets']))
+        if undecided:
+            logger.warning("Cycle %s already traded, no decision for %s until the next cycle", cycle, undecided)
+        reported = [target for target in reported if target in decision['targets']]
+    else:
+        # 3. get current portfolio
+        snapshot = account.snapshot()
+        portfolio = snapshot.balances
+        current_prices = snapshot.prices
+        logger.info("Portfolio: %s", portfolio)
+        logger.info("Current Prices: %s", current_prices)
+
+        orders = decide_orders(config, reports, portfolio, current_prices)
+        journal.put(cycle, PORTFOLIO, 'decision', {'targets': reported, 'orders': OrderBook(orders=orders)})
+
+    logger.info("Orders: %s", orders)
+
+    # 4. execute orders (each order of the decision at most once per cycle)
+    for i, order in enumerate(orders):
+        if order.symbol not in reported:
+            logger.warning("Ignoring order for %s, not backed by a report of the decision", order.symbol)
+            continue
+        executed = f'order_{i}'
+        if journal.get(cycle, PORTFOLIO, executed) is not None:
+            logger.info("Order %d (%s) already executed in cycle %s", i, order.symbol, cycle)
+            continue
+        if order.side == 'BUY':
+            try:
+                result = broker.create_otoco_order(order.symbol, order.price, order.quantity, order.take_profit, order.stop_loss)
+                account.invalidate()
+                journal.put(cycle, PORTFOLIO, executed, result)
+                logger.info("BUY order created: %s %s", order.symbol, order.quantity)
+            except Exception as e:
+                logger.error("Error creating otooco order: %s", e)
+        elif order.side == 'SELL':
+            try:
+                result = broker.create_market_order(order.symbol, order.quantity)
+                account.invalidate()
+                journal.put(cycle, PORTFOLIO, executed, result)
+                logger.info("SELL order created: %s %s", order.symbol, order.quantity)
+            except Exception as e:
+                logger.error("Error creating market order: %s", e)
+        else:
+            logger.info("HOLD %s", order.symbol)
+
+def decide_orders(config, reports, portfolio, current_prices):
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from src.schemas import OrderBook
+    from src.utils import get_llm
+    from src.prompts import portfolio_management_system_prompt
 
-    # 3. get orders
     model = get_llm(config['management']['model'])
     # model_with_structure = model.with_structured_output(OrderBook)
 
@@ -135,43 +173,188 @@ def main(config):
     formatter = get_llm(config['management']['parser'])
     formatter = formatter.with_structured_output(OrderBook)
     formatted_response = formatter.invoke(response.content)
-    orders = formatted_response.orders
-
-    logger.info("Orders: %s", orders)
+    return formatted_response.orders
 
-    # 4. execute orders
-    for order in orders:
-        if order.side == 'BUY':
-            try:
-                create_otoco_order(order.symbol, order.price, order.quantity, order.take_profit, order.stop_loss)
-                logger.info("BUY order created: %s %s", order.symbol, order.quantity)
-            except Exception as e:
-                logger.error("Error creating otooco order: %s", e)
-        elif order.side == 'SELL':
-            try:
-                create_market_order(order.symbol, order.quantity)
-                logger.info("SELL order created: %s %s", order.symbol, order.quantity)
-            except Exception as e:
-                logger.error("Error creating market order: %s", e)
-        else:
-            logger.info("HOLD %s", order.symbol)
-
-def mainWrapper():
+def load_config(path: str = 'config.yaml') -> dict:
     import yaml
-    config = yaml.safe_load(open('config.yaml', 'r'))
+    with open(path, 'r') as f:
+        return yaml.safe_load(f)
+
+def mainWrapper(config_path: str = 'config.yaml'):
+    config = load_config(config_path)
     main(config)
 
+def run_scheduled(args):
+    import schedule
 
-if __name__ == "__main__":
     logger.info(f"Starting main at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    mainWrapper()
-    schedule.every().day.at("00:00").do(mainWrapper)
-    schedule.every().day.at("04:00").do(mainWrapper)
-    schedule.every().day.at("08:00").do(mainWrapper)
-    schedule.every().day.at("12:00").do(mainWrapper)
-    schedule.every().day.at("16:00").do(mainWrapper)
-    schedule.every().day.at("20:00").do(mainWrapper)
+    mainWrapper(args.config)
+    schedule.every().day.at("00:00").do(mainWrapper, args.config)
+    schedule.every().day.at("04:00").do(mainWrapper, args.config)
+    schedule.every().day.at("08:00").do(mainWrapper, args.config)
+    schedule.every().day.at("12:00").do(mainWrapper, args.config)
+    schedule.every().day.at("16:00").do(mainWrapper, args.config)
+    schedule.every().day.at("20:00").do(mainWrapper, args.config)
 
     while True:
         schedule.run_pending()
-        time.sleep(60)  # Check every minute
\ No newline at end of file
+        time.sleep(60)  # Check every minute
+
+def run_once(args):
+    mainWrapper(args.config)
+
+def analyze(args):
+    """
+    Dry-run analysis of one symbol: prints the summaries without touching the
+    journal, the database, the shared news store or the exchange
+    """
+    import tempfile
+    from src.technical_analysis import technical_analysis
+    from src.sentimental_analysis import sentimental_analysis
+
+    config = load_config(args.config)
+    print(f"# {args.symbol}\n## Technical Analysis")
+    print(technical_analysis(args.symbol, config['technical_analysis']).summary)
+    if not args.technical_only:
+        with tempfile.TemporaryDirectory() as tmp:
+            config['sentiment_analysis']['news']['store'] = os.path.join(tmp, 'news.db')
+            print("## Sentimental Analysis")
+            print(sentimental_analysis(args.symbol, config['sentiment_analysis']).summary)
+
+def show_portfolio(args):
+    from src.account import AccountState
+    from src.paper import get_broker
+
+    config = load_config(args.config)
+    if args.paper:
+        config.setdefault('paper', {})['enabled'] = True
+    snapshot = AccountState(config['target'], broker=get_broker(config)).snapshot()
+    print(snapshot.model_dump_json(indent=2))
+
+def paper_state(config) -> dict:
+    """
+    Local files a paper run reads and writes, by config key
+    """
+    from src.journal import journal_path
+
+    paths = {
+        'paper.ledger': config['paper'].get('ledger', 'paper_ledger.json'),
+        'paper.journal': journal_path(config),
+        'sentiment_analysis.news.store': config['sentiment_analysis']['news'].get('store', 'news.db'),
+    }
+    if config.get('workers', {}).get('mode') == 'queue':
+        paths['workers.queue'] = config['workers'].get('queue', 'queue.db')
+    return {key: os.path.abspath(path) for key, path in paths.items()}
+
+def run_paper(args):
+    """
+    One paper trading cycle per config, all strategy instances running
+    concurrently in this process, each against its own ledger and journal
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = args.configs or [args.config]
+    configs = [load_config(path) for path in paths]
+    owners = {}
+    for path, config in zip(paths, configs):
+        config.setdefault('paper', {})['enabled'] = True
+        # instances sharing a ledger, journal or news store would trade and
+        # resume on each other's state
+        for key, state in paper_state(config).items():
+            if state in owners:
+                raise ValueError(f"{path} {key} {state} is already used by {owners[state]}")
+            owners[state] = f"{path} {key}"
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(configs)) as executor:
+        futures = [executor.submit(main, config) for config in configs]
+    for path, future in zip(paths, futures):
+        if future.exception() is not None:
+            logger.error("Paper run %s failed: %s", path, future.exception())
+    logger.info("%d paper cycles in %.1fs", len(configs), time.perf_counter() - start)
+
+def run_worker(args):
+    from src.workers import run_worker
+
+    config = load_config(args.config)
+    if args.paper:
+        # must match the coordinator, which journals paper cycles separately
+        config.setdefault('paper', {})['enabled'] = True
+    run_worker(config, args.shard, args.once)
+
+BENCH_MODULES = [
+    'main',
+    'src.account',
+    'src.pipeline',
+    'src.workers',
+    'langchain_openai',
+    'langchain_google_genai',
+    'supabase',
+    'binance',
+    'talib',
+]
+
+def bench_imports(args):
+    """
+    Cold import time of the entry point and of the heavy dependencies, each
+    measured in a fresh interpreter
+    """
+    code = "import time; t = time.perf_counter(); import {}; print(time.perf_counter() - t)"
+    print(f"{'module':<24}{'min (ms)':>10}{'median (ms)':>14}")
+    for module in args.modules or BENCH_MODULES:
+        timings = []
+        for _ in range(args.repeat):
+            result = subprocess.run(
+                [sys.executable, "-c", code.format(module)],
+                capture_output=True, text=True,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+            if result.returncode != 0:
+                break
+            timings.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+        if not timings:
+            print(f"{module:<24}{'not installed':>24}")
+            continue
+        timings.sort()
+        print(f"{module:<24}{timings[0]:>10.1f}{timings[len(timings) // 2]:>14.1f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="LLM swing trading bot")
+    parser.add_argument('--config', default='config.yaml')
+    commands = parser.add_subparsers(dest='command')
+
+    commands.add_parser('run', help="run now and then every 4 hours (default)").set_defaults(func=run_scheduled)
+    commands.add_parser('once', help="run a single cycle").set_defaults(func=run_once)
+
+    command = commands.add_parser('analyze', help="dry-run analysis for one symbol")
+    command.add_argument('symbol')
+    command.add_argument('--technical-only', action='store_true')
+    command.set_defaults(func=analyze)
+
+    command = commands.add_parser('portfolio', help="show the account snapshot")
+    command.add_argument('--paper', action='store_true', help="show the paper ledger instead")
+    command.set_defaults(func=show_portfolio)
+
+    command = commands.add_parser('paper', help="run one paper trading cycle per config, concurrently")
+    command.add_argument('configs', nargs='*')
+    command.set_defaults(func=run_paper)
+
+    command = commands.add_parser('worker', help="serve one shard of the queued targets")
+    command.add_argument('--shard', type=int, required=True)
+    command.add_argument('--once', action='store_true', help="exit when the shard has no pending task")
+    command.add_argument('--paper', action='store_true', help="serve a paper coordinator (python main.py paper)")
+    command.set_defaults(func=run_worker)
+
+    command = commands.add_parser('bench-imports', help="measure cold import times")
+    command.add_argument('modules', nargs='*')
+    command.add_argument('--repeat', type=int, default=5)
+    command.set_defaults(func=bench_imports)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args.func = run_scheduled
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
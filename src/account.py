@@ -0,0 +1,66 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import src.utils
+from src.schemas import AccountSnapshot
+
+from src.logger import setup_logger
+
+logger = setup_logger('account', 'project.log')
+
+class AccountState:
+    """
+    Cached, consistent view of the account: balances, open orders and prices
+    are fetched concurrently into one timestamped snapshot, which is reused
+    for `ttl` seconds or until one of our own order events invalidates it.
+    `broker` is src.utils for the live account or a paper.PaperLedger.
+    """
+    def __init__(self, symbols: List[str], ttl: float = 30, broker=src.utils):
+        self.symbols = symbols
+        self.ttl = ttl
+        self.broker = broker
+        self._snapshot = None
+        self._cleared = False  # no open order since clear_orders
+        self._lock = threading.Lock()
+
+    def snapshot(self, refresh: bool = False) -> AccountSnapshot:
+        with self._lock:
+            if (
+                refresh
+                or self._snapshot is None
+                or time.time() * 1000 - self._snapshot.timestamp > self.ttl * 1000
+            ):
+                self._snapshot = self._fetch()
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._cleared = False
+
+    def clear_orders(self):
+        """
+        Cancel every open order. Until the next order event the snapshots know
+        there is none, and skip the open orders request.
+        """
+        with self._lock:
+            self.broker.clear_orders(self.broker.get_open_orders())
+            self._snapshot = None
+            self._cleared = True
+
+    def _fetch(self) -> AccountSnapshot:
+        timestamp = int(time.time() * 1000)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            balances = executor.submit(self.broker.get_current_portfolio, self.symbols)
+            open_orders = None if self._cleared else executor.submit(self.broker.get_open_orders)
+            prices = executor.submit(self.broker.get_current_prices, self.symbols)
+            snapshot = AccountSnapshot(
+                timestamp=timestamp,
+                balances=balances.result(),
+                open_orders=open_orders.result() if open_orders is not None else [],
+                prices={x['symbol']: float(x['price']) for x in prices.result()}
+            )
+        logger.info("Account snapshot: %s", snapshot.balances)
+        return snapshot
@@ -0,0 +1,173 @@
+import math
+from typing import Callable, Dict, List, Optional
+
+from src.journal import RunJournal
+from src.schemas import TechnicalData
+
+from src.logger import setup_logger
+
+logger = setup_logger('gating', 'project.log')
+
+GATED_STAGES = ('technical_analysis', 'sentimental_analysis')
+
+def _last(array) -> Optional[float]:
+    if len(array) == 0 or math.isnan(array[-1]):
+        return None
+    return float(array[-1])
+
+def technical_fingerprint(data: TechnicalData) -> dict:
+    """
+    Cheap summary of the fetched market data: the side of every indicator
+    crossover, the last close, the Bollinger band width and the funding rate
+    """
+    close = _last(data.ohlcv['close'])
+    indicators = data.indicators
+    state = {}
+    band_width = None
+    emas = sorted(
+        (int(key.split('_')[1]), _last(indicators[key]))
+        for key in indicators.columns if key.startswith('EMA_')
+    )
+    for period, ema in emas:
+        if close is not None and ema is not None:
+            state[f'close>EMA_{period}'] = close > ema
+    for (fast, fast_ema), (slow, slow_ema) in zip(emas, emas[1:]):
+        if fast_ema is not None and slow_ema is not None:
+            state[f'EMA_{fast}>EMA_{slow}'] = fast_ema > slow_ema
+    for key in indicators.columns:
+        value = _last(indicators[key])
+        if value is None:
+            continue
+        if key.startswith('MACD_') and key.endswith('_macd'):
+            base = key[:-len('_macd')]
+            signal = _last(indicators[f'{base}_signal'])
+            state[f'{base}>0'] = value > 0
+            if signal is not None:
+                state[f'{base}>signal'] = value > signal
+        elif key.startswith('RSI_'):
+            state[key] = 'overbought' if value > 70 else 'oversold' if value < 30 else 'neutral'
+        elif key.startswith('BBANDS_') and key.endswith('_upper'):
+            base = key[:-len('_upper')]
+            lower = _last(indicators[f'{base}_lower'])
+            if lower is not None:
+                band_width = value - lower
+                state[f'close>{key}'] = close is not None and close > value
+                state[f'close<{base}_lower'] = close is not None and close < lower
+
+    funding_rate = None
+    if 'funding_rate' in data.derivative:
+        funding_rate = _last(data.derivative['funding_rate']['close'])
+
+    return {
+        'state': state,
+        'close': close,
+        'band_width': band_width,
+        'funding_rate': funding_rate,
+    }
+
+def technical_changed(reference: dict, fingerprint: dict, config: dict) -> Optional[str]:
+    """
+    Why the market moved enough since `reference` to need a new analysis, if it did
+    """
+    if reference['state'] != fingerprint['state']:
+        flipped = [key for key in fingerprint['state'] if reference['state'].get(key) != fingerprint['state'][key]]
+        return f"crossover {flipped}"
+    if None in (reference['close'], fingerprint['close'], fingerprint['band_width']):
+        return "no price reference"
+    if fingerprint['band_width'] <= 0:
+        # flat band: any move breaks out of it
+        if fingerprint['close'] != reference['close']:
+            return "price left a flat band"
+    else:
+        move = abs(fingerprint['close'] - reference['close']) / fingerprint['band_width']
+        if move >= config.get('price_move', 0.25):
+            return f"price moved {move:.2f} band widths"
+    if reference['funding_rate'] is not None and fingerprint['funding_rate'] is not None:
+        change = abs(fingerprint['funding_rate'] - reference['funding_rate'])
+        if change >= config.get('funding_rate', 0.0001):
+            return f"funding rate changed {change:.6f}"
+    return None
+
+def sentiment_fingerprint(data: dict) -> dict:
+    """
+    Cheap summary of the fetched sentiment data: the new articles and the
+    current fear & greed classification
+    """
+    fear_and_greed = data['fear_and_greed_index']['classification']
+    return {
+        'new_articles': data['news_sentiment']['new_articles'],
+        'fear_and_greed': fear_and_greed[0] if fear_and_greed else None,
+    }
+
+def sentiment_changed(reference: dict, fingerprint: dict, config: dict) -> Optional[str]:
+    unseen = len(reference.get('unseen_articles', [])) + len(fingerprint['new_articles'])
+    if unseen >= config.get('new_articles', 3):
+        return f"{unseen} new articles"
+    if reference['fear_and_greed'] != fingerprint['fear_and_greed']:
+        return f"fear & greed now {fingerprint['fear_and_greed']}"
+    return None
+
+def reuse_previous(
+    journal: RunJournal,
+    cycle: str,
+    target: str,
+    stage: str,
+    fingerprint: dict,
+    changed: Callable[[dict, dict, dict], Optional[str]],
+    config: dict
+) -> Optional[dict]:
+    """
+    The journaled `stage` result of the last analysed cycle if nothing moved
+    since then, otherwise None. The fingerprint of the analysis that would be
+    reused stays the reference, so slow drifts still trigger a new analysis,
+    and the new articles of skipped cycles are carried until one does.
+    """
+    gating = config.get('gating', {})
+    if not gating.get('enabled'):
+        return None
+    previous = journal.latest(target, f'{stage}_fingerprint', before=cycle)
+    if previous is None:
+        return None
+    previous_cycle, reference = previous
+    if reference['skips'] >= gating.get('max_skips', 2):
+        return None
+    reason = changed(reference, fingerprint, gating)
+    if reason is not None:
+        logger.info("%s %s: %s", target, stage, reason)
+        return None
+    analysis = journal.get(previous_cycle, target, stage)
+    if analysis is None:
+        return None
+
+    logger.info("%s %s unchanged since %s, reusing the previous summary", target, stage, previous_cycle)
+    journal.put(cycle, target, f'{stage}_fingerprint', dict(
+        reference,
+        skips=reference['skips'] + 1,
+        unseen_articles=reference.get('unseen_articles', []) + fingerprint.get('new_articles', [])
+    ))
+    return analysis
+
+def record_fingerprint(journal: RunJournal, cycle: str, target: str, stage: str, fingerprint: dict):
+    """
+    Journal the fingerprint of a freshly made analysis as the new reference
+    """
+    journal.put(cycle, target, f'{stage}_fingerprint', dict(fingerprint, skips=0, unseen_articles=[]))
+
+def unseen_articles(journal: RunJournal, cycle: str, target: str, stage: str) -> List[dict]:
+    """
+    New articles of the cycles skipped since the last analysis, which the
+    next analysis has to see along with its own
+    """
+    previous = journal.latest(target, f'{stage}_fingerprint', before=cycle)
+    if previous is None:
+        return []
+    return previous[1].get('unseen_articles', [])
+
+def skipped_calls(journal: RunJournal, cycle: str) -> Dict[str, int]:
+    """
+    Number of LLM calls skipped by the gate in a cycle, per stage
+    """
+    return {
+        stage: sum(1 for x in journal.stage(cycle, f'{stage}_fingerprint').values() if x['skips'] > 0)
+        for stage in GATED_STAGES
+    }
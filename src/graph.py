@@ -1,5 +1,10 @@
-from langgraph.graph import StateGraph, START, END
+from src.schemas import State
 
-from schemas import GraphState
+def build_graph():
+    """
+    Build the state graph of the strategy, langgraph is only needed here
+    """
+    from langgraph.graph import StateGraph
 
-graph_builder = StateGraph(GraphState)
\ No newline at end of file
+    graph_builder = StateGraph(State)
+    return graph_builder
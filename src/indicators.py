@@ -0,0 +1,144 @@
+from typing import Callable, Dict, List, NamedTuple, Tuple, Union
+
+import numpy as np
+import talib
+
+from src.schemas import Series
+
+class Indicator(NamedTuple):
+    func: Callable
+    inputs: Tuple[str, ...]
+    params: Dict[str, float]
+    outputs: Tuple[str, ...]
+
+INDICATORS: Dict[str, Indicator] = {}
+
+def indicator(name: str, inputs: Tuple[str, ...], params: Dict[str, float], outputs: Tuple[str, ...]):
+    """
+    Register an indicator: the ohlcv columns it reads, its parameters with
+    their defaults, and the names of the arrays it returns (in order)
+    """
+    def register(func):
+        INDICATORS[name] = Indicator(func, inputs, params, outputs)
+        return func
+    return register
+
+class IndicatorContext:
+    """
+    Inputs of the indicators of one series, memoizing shared intermediates
+    (EMAs, SMAs, typical price) so each is computed once across indicators,
+    e.g. BBANDS reuses the SMA of the same period
+    """
+    def __init__(self, data: Series):
+        self.data = data
+        self._cache = {}
+
+    def cached(self, key: tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def ema(self, period: int, source: str = 'close') -> np.ndarray:
+        return self.cached(('EMA', source, period), lambda: talib.EMA(self.data[source], timeperiod=period))
+
+    def sma(self, period: int, source: str = 'close') -> np.ndarray:
+        return self.cached(('SMA', source, period), lambda: talib.SMA(self.data[source], timeperiod=period))
+
+    def typical_price(self) -> np.ndarray:
+        return self.cached(('TYPPRICE',), lambda: talib.TYPPRICE(self.data['high'], self.data['low'], self.data['close']))
+
+@indicator('EMA', inputs=('close',), params={'timeperiod': 30}, outputs=('ema',))
+def ema(ctx: IndicatorContext, timeperiod):
+    return (ctx.ema(timeperiod),)
+
+@indicator('SMA', inputs=('close',), params={'timeperiod': 30}, outputs=('sma',))
+def sma(ctx: IndicatorContext, timeperiod):
+    return (ctx.sma(timeperiod),)
+
+@indicator('RSI', inputs=('close',), params={'timeperiod': 14}, outputs=('rsi',))
+def rsi(ctx: IndicatorContext, timeperiod):
+    return (talib.RSI(ctx.data['close'], timeperiod=timeperiod),)
+
+@indicator(
+    'MACD',
+    inputs=('close',),
+    params={'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9},
+    outputs=('macd', 'signal', 'hist')
+)
+def macd(ctx: IndicatorContext, fastperiod, slowperiod, signalperiod):
+    # not built from the shared EMAs: talib seeds the fast EMA at the slow
+    # period's start, and over a short lookback the two never converge
+    return talib.MACD(
+        ctx.data['close'],
+        fastperiod=fastperiod,
+        slowperiod=slowperiod,
+        signalperiod=signalperiod
+    )
+
+@indicator(
+    'BBANDS',
+    inputs=('close',),
+    params={'timeperiod': 20, 'stddev': 2},
+    outputs=('upper', 'middle', 'lower')
+)
+def bbands(ctx: IndicatorContext, timeperiod, stddev):
+    middle = ctx.sma(timeperiod)
+    deviation = stddev * talib.STDDEV(ctx.data['close'], timeperiod=timeperiod, nbdev=1)
+    return middle + deviation, middle, middle - deviation
+
+@indicator('ATR', inputs=('high', 'low', 'close'), params={'timeperiod': 14}, outputs=('atr',))
+def atr(ctx: IndicatorContext, timeperiod):
+    return (talib.ATR(ctx.data['high'], ctx.data['low'], ctx.data['close'], timeperiod=timeperiod),)
+
+@indicator('OBV', inputs=('close', 'volume'), params={}, outputs=('obv',))
+def obv(ctx: IndicatorContext):
+    return (talib.OBV(ctx.data['close'], ctx.data['volume']),)
+
+@indicator('VWAP', inputs=('high', 'low', 'close', 'volume'), params={'timeperiod': 20}, outputs=('vwap',))
+def vwap(ctx: IndicatorContext, timeperiod):
+    # rolling VWAP of the typical price
+    volume = ctx.data['volume']
+    traded = talib.SUM(ctx.typical_price() * volume, timeperiod=timeperiod)
+    return (traded / talib.SUM(volume, timeperiod=timeperiod),)
+
+def indicator_names(name: str, params: dict) -> List[str]:
+    """
+    Column names of one parameterization, e.g. EMA_10 or MACD_12_26_9_signal
+    """
+    spec = INDICATORS[name]
+    base = "_".join([name] + [str(params[key]) for key in spec.params])
+    if len(spec.outputs) == 1:
+        return [base]
+    return [f"{base}_{output}" for output in spec.outputs]
+
+def compute_indicators(data: Series, config: Dict[str, Union[dict, List[dict]]]) -> Series:
+    """
+    Compute the configured indicators. `config` maps an indicator name to a
+    parameterization or a list of them, e.g. {'EMA': [{'timeperiod': 10}, {'timeperiod': 50}]}
+    """
+    ctx = IndicatorContext(data)
+    columns, values = [], []
+    for name, parameterizations in config.items():
+        if name not in INDICATORS:
+            raise ValueError(f'Indicator {name} not found')
+        spec = INDICATORS[name]
+        if parameterizations is None:
+            # `OBV:` in the yaml, i.e. the defaults
+            parameterizations = [{}]
+        if isinstance(parameterizations, dict):
+            parameterizations = [parameterizations]
+        for params in parameterizations:
+            unknown = set(params or {}) - set(spec.params)
+            if unknown:
+                raise ValueError(f'Unknown parameters {sorted(unknown)} for indicator {name}')
+            params = dict(spec.params, **(params or {}))
+            names = indicator_names(name, params)
+            if names[0] in columns:
+                continue
+            columns += names
+            values += spec.func(ctx, **params)
+    return Series(
+        columns=columns,
+        open_time=data.open_time,
+        values=np.stack(values) if values else np.empty((0, len(data)))
+    )
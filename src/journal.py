@@ -0,0 +1,116 @@
+import time
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pytz
+import numpy as np
+from pydantic import BaseModel
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stages (
+    cycle TEXT,
+    target TEXT,
+    stage TEXT,
+    payload TEXT,
+    created INTEGER,
+    PRIMARY KEY (cycle, target, stage)
+);
+"""
+
+INTERVAL_SECONDS = {
+    '1h': 3600,
+    '4h': 3600 * 4,
+    '1d': 3600 * 24,
+}
+
+# target of the stages that are not tied to one symbol (order clearing, decision)
+PORTFOLIO = '*'
+
+def cycle_id(interval: str = '4h', now: Optional[float] = None) -> str:
+    """
+    Identifier of the cycle `now` falls in, i.e. the open time of the current
+    candle, so that a rerun within the same candle resumes the same cycle
+    """
+    now = int(now if now is not None else time.time())
+    start = now - now % INTERVAL_SECONDS[interval]
+    return datetime.fromtimestamp(start, pytz.utc).strftime("%Y-%m-%dT%H:%M")
+
+def journal_path(config: dict) -> str:
+    """
+    Journal of a config: paper runs keep their own, so they never resume (or
+    trade on) the stages of live cycles
+    """
+    if config.get('paper', {}).get('enabled'):
+        return config['paper'].get('journal', 'paper_runs.db')
+    return config.get('journal', {}).get('path', 'runs.db')
+
+def _encode(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class RunJournal:
+    """
+    Per cycle, per target, per stage store of pipeline results so that a
+    crashed or partially failed cycle can be resumed without redoing work
+    """
+    def __init__(self, path: str = 'runs.db'):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, cycle: str, target: str, stage: str) -> Optional[Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM stages WHERE cycle = ? AND target = ? AND stage = ?",
+                (cycle, target, stage)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest(self, target: str, stage: str, before: str) -> Optional[tuple]:
+        """
+        (cycle, payload) of the most recent cycle before `before` that has `stage`
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT cycle, payload FROM stages
+                WHERE target = ? AND stage = ? AND cycle < ?
+                ORDER BY cycle DESC LIMIT 1""",
+                (target, stage, before)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def stage(self, cycle: str, stage: str) -> Dict[str, Any]:
+        """
+        Payload of `stage` for every target of a cycle
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT target, payload FROM stages WHERE cycle = ? AND stage = ?",
+                (cycle, stage)
+            ).fetchall()
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def put(self, cycle: str, target: str, stage: str, payload: Any):
+        payload = json.dumps(payload, default=_encode)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?)",
+                (cycle, target, stage, payload, int(time.time()))
+            )
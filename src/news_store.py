@@ -0,0 +1,189 @@
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger('news_store', 'project.log')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    key TEXT PRIMARY KEY,
+    url TEXT,
+    title TEXT,
+    source TEXT,
+    time_published TEXT,
+    summary TEXT,
+    overall_score REAL,
+    overall_label TEXT,
+    first_seen INTEGER,
+    last_seen INTEGER
+);
+CREATE TABLE IF NOT EXISTS ticker_sentiment (
+    key TEXT,
+    ticker TEXT,
+    relevance REAL,
+    score REAL,
+    label TEXT,
+    digest TEXT,
+    PRIMARY KEY (key, ticker)
+);
+CREATE INDEX IF NOT EXISTS ticker_sentiment_ticker ON ticker_sentiment (ticker);
+CREATE TABLE IF NOT EXISTS fetches (
+    ticker TEXT PRIMARY KEY,
+    fetched_at INTEGER
+);
+"""
+
+def article_key(article: dict) -> str:
+    """
+    Stable identity of an AlphaVantage article (hash of its url)
+    """
+    return hashlib.sha1((article.get('url') or article.get('title', '')).encode()).hexdigest()
+
+def article_digest(article: dict, sentiment: dict) -> str:
+    """
+    Hash of the parts of an article the LLM cares about for one ticker.
+    Scores are rounded so that float noise is not reported as a change.
+    """
+    parts = [
+        article.get('title', ''),
+        article.get('summary', ''),
+        f"{float(article.get('overall_sentiment_score', 0)):.2f}",
+        f"{float(sentiment.get('relevance_score', 0)):.2f}",
+        f"{float(sentiment.get('ticker_sentiment_score', 0)):.2f}",
+        sentiment.get('ticker_sentiment_label', ''),
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+
+def compact_article(article: dict, sentiment: dict) -> dict:
+    """
+    Reduce an article to the fields passed to the LLM
+    """
+    return {
+        'title': article.get('title'),
+        'source': article.get('source'),
+        'time_published': article.get('time_published'),
+        'summary': article.get('summary'),
+        'relevance': float(sentiment.get('relevance_score', 0)),
+        'sentiment_score': float(sentiment.get('ticker_sentiment_score', 0)),
+        'sentiment_label': sentiment.get('ticker_sentiment_label'),
+    }
+
+class NewsStore:
+    """
+    Local article store keyed by url hash, keeping per-ticker relevance and
+    sentiment scores so that every cycle only forwards new or changed articles
+    """
+    def __init__(self, path: str = 'news.db'):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def last_fetch(self, ticker: str) -> Optional[int]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT fetched_at FROM fetches WHERE ticker = ?", (ticker,)).fetchone()
+        return row[0] if row else None
+
+    def record_fetch(self, ticker: str, fetched_at: Optional[int] = None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fetches (ticker, fetched_at) VALUES (?, ?)",
+                (ticker, fetched_at or int(time.time()))
+            )
+
+    def update(self, ticker: str, articles: Iterable[dict]) -> List[dict]:
+        """
+        Upsert the articles mentioning `ticker` and return the compact form of
+        those that are new or whose content/scores changed since last seen
+        """
+        now = int(time.time())
+        fresh = []
+        with self._connect() as conn:
+            for article in articles:
+                sentiment = next(
+                    (x for x in article.get('ticker_sentiment', []) if x.get('ticker') == ticker),
+                    None
+                )
+                if sentiment is None:
+                    continue
+                key = article_key(article)
+                digest = article_digest(article, sentiment)
+                row = conn.execute(
+                    "SELECT digest FROM ticker_sentiment WHERE key = ? AND ticker = ?", (key, ticker)
+                ).fetchone()
+                conn.execute(
+                    """INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        title = excluded.title,
+                        summary = excluded.summary,
+                        overall_score = excluded.overall_score,
+                        overall_label = excluded.overall_label,
+                        last_seen = excluded.last_seen""",
+                    (
+                        key, article.get('url'), article.get('title'), article.get('source'),
+                        article.get('time_published'), article.get('summary'),
+                        float(article.get('overall_sentiment_score', 0)),
+                        article.get('overall_sentiment_label'), now, now
+                    )
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO ticker_sentiment VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        key, ticker,
+                        float(sentiment.get('relevance_score', 0)),
+                        float(sentiment.get('ticker_sentiment_score', 0)),
+                        sentiment.get('ticker_sentiment_label'),
+                        digest
+                    )
+                )
+                if row is None or row[0] != digest:
+                    fresh.append(dict(compact_article(article, sentiment), key=key))
+        return fresh
+
+    def aggregate(self, ticker: str, since: str, exclude: Iterable[str] = ()) -> dict:
+        """
+        Rolling aggregate of the stored articles for `ticker` published after
+        `since` (AlphaVantage YYYYMMDDTHHMM format), excluding the given keys
+        """
+        exclude = set(exclude)
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT a.key, a.source, t.relevance, t.score, t.label
+                FROM ticker_sentiment t JOIN articles a ON a.key = t.key
+                WHERE t.ticker = ? AND a.time_published >= ?""",
+                (ticker, since)
+            ).fetchall()
+        rows = [row for row in rows if row[0] not in exclude]
+        weight = sum(row[2] for row in rows)
+        labels = {}
+        for row in rows:
+            labels[row[4]] = labels.get(row[4], 0) + 1
+        return {
+            'articles': len(rows),
+            'sources': len(set(row[1] for row in rows)),
+            'weighted_sentiment_score': round(sum(row[2] * row[3] for row in rows) / weight, 4) if weight else None,
+            'labels': labels,
+        }
+
+    def prune(self, before: str):
+        """
+        Drop articles published before `before` (YYYYMMDDTHHMM)
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM ticker_sentiment WHERE key IN (SELECT key FROM articles WHERE time_published < ?)",
+                (before,)
+            )
+            conn.execute("DELETE FROM articles WHERE time_published < ?", (before,))
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from src.utils import TRADING_FEE, base_asset, get_current_prices
+
+from src.logger import setup_logger
+
+logger = setup_logger('paper', 'project.log')
+
+QUOTE = 'USDT'
+
+INSUFFICIENT_BALANCE = {'code': -2010, 'msg': 'Account has insufficient balance for requested action.'}
+
+class PaperLedger:
+    """
+    Local order ledger exposing the order and account functions of src.utils
+    (create_otoco_order, create_market_order, clear_orders, ...), so the
+    pipeline can run end to end without sending orders to Binance.
+
+    Limit BUYs fill when the price feed trades at or below their price (at
+    the market price, as a taker, if they cross when placed), then
+    their OCO legs become active: the take profit fills at or above its price,
+    the stop loss at or below its stop. Fees are taken from TRADING_FEE (in %)
+    on the received asset, like Binance does without BNB discounts.
+    """
+    def __init__(
+        self,
+        balances: Optional[Dict[str, float]] = None,
+        path: Optional[str] = None,
+        price_feed: Callable[[List[str]], list] = get_current_prices
+    ):
+        self.path = path
+        self.price_feed = price_feed
+        self.balances = dict(balances or {})
+        self.locked = {}
+        self.orders = []   # open orders: working BUYs and active OCO legs
+        self.pending = []  # OCO legs waiting for their working BUY to fill
+        self.trades = []
+        self.fees = {}
+        self.prices = {}
+        self.next_id = 1
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self._load()
+
+    # ---- persistence
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            state = json.load(f)
+        for key in ('balances', 'locked', 'orders', 'pending', 'trades', 'fees', 'prices', 'next_id'):
+            setattr(self, key, state[key])
+
+    def _save(self):
+        if not self.path:
+            return
+        state = {
+            key: getattr(self, key)
+            for key in ('balances', 'locked', 'orders', 'pending', 'trades', 'fees', 'prices', 'next_id')
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    # ---- helpers
+
+    def _id(self) -> int:
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _move(self, asset: str, amount: float, source: dict, target: dict):
+        source[asset] = source.get(asset, 0.0) - amount
+        target[asset] = target.get(asset, 0.0) + amount
+
+    def _order(self, symbol, list_id, side, order_type, price, quantity, stop_price=None) -> dict:
+        return {
+            'symbol': symbol,
+            'orderId': self._id(),
+            'orderListId': list_id,
+            'side': side,
+            'type': order_type,
+            'price': price,
+            'stopPrice': stop_price,
+            'origQty': quantity,
+            'status': 'NEW',
+            'time': int(time.time() * 1000),
+        }
+
+    def _trade(self, order: dict, price: float, quantity: float, fee_type: str):
+        """
+        Settle a fill of `order` against the locked balance it reserved
+        """
+        base = base_asset(order['symbol'])
+        rate = TRADING_FEE[fee_type] / 100
+        if order['side'] == 'BUY':
+            self.locked[QUOTE] = self.locked.get(QUOTE, 0.0) - order['price'] * order['origQty']
+            # a fill below the limit price gives back the difference
+            self.balances[QUOTE] = self.balances.get(QUOTE, 0.0) + (order['price'] - price) * quantity
+            fee_asset, fee = base, quantity * rate
+            self.balances[base] = self.balances.get(base, 0.0) + quantity - fee
+        else:
+            self.locked[base] = self.locked.get(base, 0.0) - quantity
+            fee_asset, fee = QUOTE, quantity * price * rate
+            self.balances[QUOTE] = self.balances.get(QUOTE, 0.0) + quantity * price - fee
+        self.fees[fee_asset] = self.fees.get(fee_asset, 0.0) + fee
+        trade = {
+            'symbol': order['symbol'],
+            'orderId': order['orderId'],
+            'side': order['side'],
+            'type': order['type'],
+            'price': price,
+            'qty': quantity,
+            'commission': fee,
+            'commissionAsset': fee_asset,
+            'time': int(time.time() * 1000),
+        }
+        self.trades.append(trade)
+        logger.info("Paper fill: %s", trade)
+        return trade
+
+    # ---- src.utils order interface
+
+    def create_otoco_order(
+        self,
+        symbol: str,
+        price: float,
+        quantity: float,
+        take_profit: float,
+        stop_loss: float,
+    ):
+        with self._lock:
+            cost = price * quantity
+            if self.balances.get(QUOTE, 0.0) < cost:
+                return INSUFFICIENT_BALANCE
+            self._move(QUOTE, cost, self.balances, self.locked)
+            list_id = self._id()
+            working = self._order(symbol, list_id, 'BUY', 'LIMIT', price, quantity)
+            legs = [
+                self._order(symbol, list_id, 'SELL', 'LIMIT_MAKER', take_profit, quantity),
+                self._order(symbol, list_id, 'SELL', 'STOP_LOSS_LIMIT', stop_loss, quantity, stop_loss),
+            ]
+            self.orders.append(working)
+            self.pending.extend(legs)
+            if symbol in self.prices:
+                self._fill({symbol: self.prices[symbol]}, placed=working['orderId'])
+            self._save()
+            return {
+                'orderListId': list_id,
+                'listOrderStatus': 'EXECUTING',
+                'orderReports': [working] + legs,
+            }
+
+    def create_market_order(
+        self,
+        symbol: str,
+        quantity: float,
+    ):
+        with self._lock:
+            base = base_asset(symbol)
+            if symbol not in self.prices:
+                self.get_current_prices([symbol])
+            if self.balances.get(base, 0.0) < quantity or symbol not in self.prices:
+                return INSUFFICIENT_BALANCE
+            self._move(base, quantity, self.balances, self.locked)
+            order = self._order(symbol, -1, 'SELL', 'MARKET', None, quantity)
+            trade = self._trade(order, self.prices[symbol], quantity, 'taker')
+            self._save()
+            return dict(order, status='FILLED', fills=[trade])
+
+    def cancel_order(self, symbol, order_id):
+        with self._lock:
+            order = next((x for x in self.orders if x['orderId'] == order_id), None)
+            if order is None:
+                return
+            siblings = [
+                x for x in self.orders + self.pending
+                if x['orderListId'] == order['orderListId'] and x['orderListId'] != -1
+            ]
+            # cancelling one order of a list cancels the whole list, like Binance
+            for x in siblings:
+                if x['side'] == 'BUY':
+                    self._move(QUOTE, x['price'] * x['origQty'], self.locked, self.balances)
+            if any(x in self.orders and x['side'] == 'SELL' for x in siblings):
+                self._move(base_asset(symbol), order['origQty'], self.locked, self.balances)
+            ids = set(x['orderId'] for x in siblings) | {order_id}
+            self.orders = [x for x in self.orders if x['orderId'] not in ids]
+            self.pending = [x for x in self.pending if x['orderId'] not in ids]
+            self._save()
+
+    def get_open_orders(self):
+        with self._lock:
+            return [dict(x) for x in self.orders]
+
+    def clear_orders(self, orders: Optional[list] = None):
+        with self._lock:
+            for order in list(self.orders):
+                self.cancel_order(order['symbol'], order['orderId'])
+
+    def get_current_portfolio(self, symbols):
+        with self._lock:
+            assets = set(base_asset(x) for x in symbols) | {QUOTE}
+            return {asset: round(self.balances.get(asset, 0.0), 4) for asset in assets}
+
+    def get_current_prices(self, symbols):
+        """
+        Prices from the feed (live Binance prices by default), applying any
+        fill they trigger before returning them
+        """
+        prices = self.price_feed(symbols)
+        self.apply_prices({x['symbol']: float(x['price']) for x in prices})
+        return prices
+
+    # ---- price feed
+
+    def apply_prices(self, prices: Dict[str, float]) -> List[dict]:
+        """
+        Apply a tick of the live or recorded price feed, returning the fills
+        """
+        with self._lock:
+            self.prices.update(prices)
+            fills = self._fill(prices)
+            self._save()
+            return fills
+
+    def _fill(self, prices: Dict[str, float], placed: Optional[int] = None) -> List[dict]:
+        """
+        Fill the orders the prices trade through. The order `placed` was just
+        sent: if it crosses, it takes liquidity at the market price like on
+        Binance, while a resting order fills at its own price as a maker.
+        """
+        fills = []
+        for order in [x for x in self.orders if x['side'] == 'BUY']:
+            price = prices.get(order['symbol'])
+            if price is None or price > order['price']:
+                continue
+            if order['orderId'] == placed:
+                trade = self._trade(order, min(price, order['price']), order['origQty'], 'taker')
+            else:
+                trade = self._trade(order, order['price'], order['origQty'], 'maker')
+            fills.append(trade)
+            self.orders.remove(order)
+            # the OCO legs sell what was received after fees
+            received = order['origQty'] - trade['commission']
+            for leg in [x for x in self.pending if x['orderListId'] == order['orderListId']]:
+                self.pending.remove(leg)
+                self.orders.append(dict(leg, origQty=received))
+            self._move(base_asset(order['symbol']), received, self.balances, self.locked)
+
+        # legs activated at this tick may trigger right away
+        for order in [x for x in self.orders if x['side'] == 'SELL']:
+            price = prices.get(order['symbol'])
+            if price is None or order not in self.orders:
+                continue
+            if order['type'] == 'LIMIT_MAKER' and price >= order['price']:
+                fills.append(self._trade(order, order['price'], order['origQty'], 'maker'))
+                self._close_list(order)
+            elif order['type'] == 'STOP_LOSS_LIMIT' and price <= order['stopPrice']:
+                fills.append(self._trade(order, order['stopPrice'], order['origQty'], 'taker'))
+                self._close_list(order)
+        return fills
+
+    def _close_list(self, order: dict):
+        self.orders = [x for x in self.orders if x['orderListId'] != order['orderListId']]
+
+def get_broker(config: dict):
+    """
+    The order functions to trade with: src.utils for live trading, or a
+    PaperLedger when `paper.enabled` is set
+    """
+    paper = config.get('paper', {})
+    if not paper.get('enabled'):
+        import src.utils
+        return src.utils
+    return PaperLedger(
+        balances=paper.get('balances', {QUOTE: 10000}),
+        path=paper.get('ledger', 'paper_ledger.json')
+    )
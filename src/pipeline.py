@@ -0,0 +1,154 @@
+import asyncio
+from typing import Dict, List
+
+from src.journal import RunJournal
+from src.schemas import Report, SentimentalAnalysis, TechnicalAnalysis, TechnicalData
+from src.technical_analysis import get_technical_data, technical_analysis
+from src.sentimental_analysis import fetch_sentiment_data, sentimental_analysis
+from src.gating import (
+    record_fingerprint, reuse_previous, sentiment_changed, sentiment_fingerprint,
+    technical_changed, technical_fingerprint, unseen_articles
+)
+
+from src.logger import setup_logger
+
+logger = setup_logger('pipeline', 'project.log')
+
+def run_technical_analysis(
+    target: str,
+    config: dict,
+    journal: RunJournal,
+    cycle: str
+) -> TechnicalAnalysis:
+    """
+    Technical analysis of one target, resuming from the journaled stages
+    """
+    cached = journal.get(cycle, target, 'technical_analysis')
+    if cached is not None:
+        logger.info("Resuming technical analysis for %s from cycle %s", target, cycle)
+        return TechnicalAnalysis.model_validate(cached)
+
+    data = journal.get(cycle, target, 'technical_data')
+    if data is not None:
+        data = TechnicalData.model_validate(data)
+    else:
+        data = get_technical_data(target, config['technical_analysis'])
+        journal.put(cycle, target, 'technical_data', data)
+
+    fingerprint = technical_fingerprint(data)
+    previous = reuse_previous(journal, cycle, target, 'technical_analysis', fingerprint, technical_changed, config)
+    if previous is not None:
+        analysis = TechnicalAnalysis(ohlcv=data.ohlcv, indicators=data.indicators, summary=previous['summary'])
+    else:
+        analysis = technical_analysis(target, config['technical_analysis'], data)
+        record_fingerprint(journal, cycle, target, 'technical_analysis', fingerprint)
+    journal.put(cycle, target, 'technical_analysis', analysis)
+    return analysis
+
+def run_sentiment_data(
+    targets: List[str],
+    config: dict,
+    journal: RunJournal,
+    cycle: str
+) -> Dict[str, dict]:
+    """
+    Batched sentiment inputs, fetching only the targets not journaled yet
+    """
+    data = {}
+    for target in targets:
+        cached = journal.get(cycle, target, 'sentiment_data')
+        if cached is not None:
+            data[target] = cached
+    missing = [target for target in targets if target not in data]
+    if missing:
+        fetched = fetch_sentiment_data(missing, config['sentiment_analysis'])
+        for target in missing:
+            journal.put(cycle, target, 'sentiment_data', fetched[target])
+        data.update(fetched)
+    return data
+
+def run_sentiment_analysis(
+    target: str,
+    config: dict,
+    journal: RunJournal,
+    cycle: str,
+    data: dict
+) -> SentimentalAnalysis:
+    """
+    Sentimental analysis of one target, resuming from the journaled stages
+    """
+    cached = journal.get(cycle, target, 'sentimental_analysis')
+    if cached is not None:
+        logger.info("Resuming sentimental analysis for %s from cycle %s", target, cycle)
+        return SentimentalAnalysis.model_validate(cached)
+
+    fingerprint = sentiment_fingerprint(data)
+    previous = reuse_previous(journal, cycle, target, 'sentimental_analysis', fingerprint, sentiment_changed, config)
+    if previous is not None:
+        analysis = SentimentalAnalysis.model_validate(previous)
+    else:
+        news = data['news_sentiment']
+        # articles fetched during skipped cycles were never analysed
+        carried = [x for x in unseen_articles(journal, cycle, target, 'sentimental_analysis') if x not in news['new_articles']]
+        if carried:
+            data = dict(data, news_sentiment=dict(news, new_articles=carried + news['new_articles']))
+        analysis = sentimental_analysis(target, config['sentiment_analysis'], data)
+        record_fingerprint(journal, cycle, target, 'sentimental_analysis', fingerprint)
+    journal.put(cycle, target, 'sentimental_analysis', analysis)
+    return analysis
+
+async def async_technical_analysis(target: str, config: dict, journal: RunJournal, cycle: str):
+    loop = asyncio.get_event_loop()
+    result = await loop.run_in_executor(None, run_technical_analysis, target, config, journal, cycle)
+    return result
+
+async def async_sentiment_analysis(target: str, config: dict, journal: RunJournal, cycle: str, data: dict):
+    loop = asyncio.get_event_loop()
+    result = await loop.run_in_executor(None, run_sentiment_analysis, target, config, journal, cycle, data)
+    return result
+
+async def async_sentiment_reports(targets: List[str], config: dict, journal: RunJournal, cycle: str):
+    # one shared news / fear & greed fetch, then one LLM call per target on its own slice
+    loop = asyncio.get_event_loop()
+    data = await loop.run_in_executor(None, run_sentiment_data, targets, config, journal, cycle)
+    return await asyncio.gather(
+        *[async_sentiment_analysis(target, config, journal, cycle, data[target]) for target in targets],
+        return_exceptions=True
+    )
+
+async def generate_reports(
+    targets: List[str],
+    config: dict,
+    journal: RunJournal,
+    cycle: str
+) -> List[Report]:
+    """
+    Reports of every target whose analyses succeeded. A failing target is
+    logged and left out; its finished stages stay journaled for the rerun.
+    """
+    tech_tasks = [async_technical_analysis(target, config, journal, cycle) for target in targets]
+
+    # Run the technical analyses and the sentiment stage concurrently.
+    tech_results, sentiment_results = await asyncio.gather(
+        asyncio.gather(*tech_tasks, return_exceptions=True),
+        async_sentiment_reports(targets, config, journal, cycle),
+        return_exceptions=True
+    )
+    if isinstance(sentiment_results, Exception):
+        logger.error("Error fetching sentiment data: %s", sentiment_results)
+        sentiment_results = [sentiment_results] * len(targets)
+
+    reports = []
+    for target, tech, sent in zip(targets, tech_results, sentiment_results):
+        if isinstance(tech, Exception):
+            logger.error("Technical analysis failed for %s: %s", target, tech)
+            continue
+        if isinstance(sent, Exception):
+            logger.error("Sentimental analysis failed for %s: %s", target, sent)
+            continue
+        reports.append(Report(
+            name=target,
+            technical_analysis=tech,
+            sentimental_analysis=sent
+        ))
+    return reports
@@ -1,10 +1,77 @@
-from typing import List, Optional
+from typing import Annotated, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, Field, PlainSerializer, PlainValidator, model_validator
+
+def _as_array(dtype, ndim: int):
+    def validate(value):
+        array = np.ascontiguousarray(value, dtype=dtype)
+        if array.size == 0:
+            array = array.reshape((0,) * ndim)
+        if array.ndim != ndim:
+            raise ValueError(f"expected a {ndim}-D array, got shape {array.shape}")
+        return array
+    return validate
+
+Int64Array = Annotated[
+    np.ndarray,
+    PlainValidator(_as_array(np.int64, 1)),
+    PlainSerializer(lambda x: x.tolist(), return_type=list)
+]
+Float64Block = Annotated[
+    np.ndarray,
+    PlainValidator(_as_array(np.float64, 2)),
+    PlainSerializer(lambda x: x.tolist(), return_type=list)
+]
+
+class Series(BaseModel):
+    """
+    Time series stored as one int64 time column and one contiguous float64
+    block with a row per column, so that `series['close']` is a zero-copy,
+    contiguous view that can be fed to talib directly
+    """
+    columns: List[str] = Field(description="The names of the rows of values")
+    open_time: Int64Array = Field(description="The open time of each point in milliseconds")
+    values: Float64Block = Field(description="The values, shape (len(columns), len(open_time))")
+
+    @model_validator(mode='after')
+    def check_shape(self):
+        if self.values.size == 0 and (len(self.columns) == 0 or len(self.open_time) == 0):
+            # an empty block loses its shape in JSON, e.g. no indicators configured
+            self.values = np.empty((len(self.columns), len(self.open_time)))
+        if self.values.shape != (len(self.columns), len(self.open_time)):
+            raise ValueError(f"values shape {self.values.shape} does not match {len(self.columns)} columns x {len(self.open_time)} points")
+        return self
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        if key == 'open_time':
+            return self.open_time
+        return self.values[self.columns.index(key)]
+
+    def __contains__(self, key: str) -> bool:
+        return key == 'open_time' or key in self.columns
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def keys(self) -> List[str]:
+        return ['open_time'] + self.columns
+
+    def to_dict(self) -> dict:
+        """
+        Column-wise lists, e.g. {'open_time': [...], 'close': [...]}
+        """
+        return {key: self[key].tolist() for key in self.keys()}
+
+class TechnicalData(BaseModel):
+    ohlcv: Series = Field(description="The ohlcv of the target cryptocurrency")
+    indicators: Series = Field(description="The indicators of the target cryptocurrency")
+    derivative: Dict[str, Series] = Field(description="The derivative market history of the target cryptocurrency")
+    bitcoin_dominance: dict = Field(description="The bitcoin dominance history")
 
 class TechnicalAnalysis(BaseModel):
-    ohlcv: dict = Field(description="The ohlcv of the target cryptocurrency")
-    indicators: dict = Field(description="The indicators of the target cryptocurrency")
+    ohlcv: Series = Field(description="The ohlcv of the target cryptocurrency")
+    indicators: Series = Field(description="The indicators of the target cryptocurrency")
     summary: str = Field(description="The summary of the technical analysis")
 
 class SentimentalAnalysis(BaseModel):
@@ -31,4 +98,10 @@ class Order(BaseModel):
     stop_loss: Optional[float] = Field(description="The stop loss of the order")
 
 class OrderBook(BaseModel):
-    orders: List[Order] = Field(description="The orders of the user")
\ No newline at end of file
+    orders: List[Order] = Field(description="The orders of the user")
+
+class AccountSnapshot(BaseModel):
+    timestamp: int = Field(description="The time the snapshot was taken in milliseconds")
+    balances: Dict[str, float] = Field(description="The free balance of the tracked assets")
+    open_orders: List[dict] = Field(description="The open orders of the account")
+    prices: Dict[str, float] = Field(description="The current price of the targets")
@@ -1,28 +1,122 @@
 import os
+import time
 import requests
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
-from pytrends.request import TrendReq
-from langchain_core.messages import HumanMessage, SystemMessage
-
 from src.schemas import SentimentalAnalysis
-from src.utils import get_llm, NAMES
+from src.utils import get_llm, base_asset, NAMES
+from src.news_store import NewsStore
 from src.prompts import sentiment_analysis_system_prompt
 
 from src.logger import setup_logger
 
 logger = setup_logger('sentimental_analysis', 'project.log')
 
-def get_news_sentiment(symbol, days=7, limit=50):
-    # get contents
-    tickers = f"Cypto:{symbol.strip('USDT')}"
-    time_from = (datetime.utcnow() - timedelta(days=days)).strftime("%Y%m%dT%H%M")
-    url = f'https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={tickers}&time_from={time_from}&apikey={os.getenv("ALPHAVANTAGE_API_KEY")}'
+NEWS_TIME_FORMAT = "%Y%m%dT%H%M"
+
+def news_ticker(symbol: str) -> str:
+    """
+    AlphaVantage ticker of a trading pair, e.g. BTCUSDT -> CRYPTO:BTC
+    """
+    return f"CRYPTO:{base_asset(symbol)}"
+
+NEWS_MAX_LIMIT = 1000 # AlphaVantage cap per request
+
+def get_news_sentiment(symbols, days=7, limit=50, time_from: Optional[str] = None, time_to: Optional[str] = None):
+    """
+    Get news sentiment from AlphaVantage for one or more trading pairs.
+    Multiple `tickers` are AND-ed by AlphaVantage (articles mentioning all of
+    them), so several symbols are fetched through the blockchain topic instead
+    and split by `ticker_sentiment` afterwards.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    if len(symbols) == 1:
+        query = f"tickers={news_ticker(symbols[0])}"
+    else:
+        query = "topics=blockchain"
+    if time_from is None:
+        time_from = (datetime.utcnow() - timedelta(days=days)).strftime(NEWS_TIME_FORMAT)
+    if time_to is not None:
+        query += f"&time_to={time_to}"
+    url = f'https://www.alphavantage.co/query?function=NEWS_SENTIMENT&{query}&time_from={time_from}&sort=LATEST&limit={min(limit, NEWS_MAX_LIMIT)}&apikey={os.getenv("ALPHAVANTAGE_API_KEY")}'
     response = requests.get(url)
     response.raise_for_status()
     data = response.json()
     return data
 
+def get_news_window(symbols: List[str], time_from: str, limit: int, max_pages: int = 3) -> Tuple[list, bool]:
+    """
+    Articles published since `time_from`. AlphaVantage returns the latest
+    `limit` ones, so a full page is followed by the page ending at its
+    oldest article, up to `max_pages`. Also returns whether the fetch
+    succeeded, i.e. the window can be recorded as fetched.
+    """
+    feed, time_to = [], None
+    for _ in range(max_pages):
+        data = get_news_sentiment(symbols, limit=limit, time_from=time_from, time_to=time_to)
+        if 'feed' not in data:
+            # rate limit / error notes come back with a 200 status
+            logger.warning("No news feed for %s: %s", symbols, data)
+            return feed, False
+        feed += data['feed']
+        if len(data['feed']) < limit:
+            return feed, True
+        oldest = min(x['time_published'] for x in data['feed'])[:len("YYYYMMDDTHHMM")]
+        if oldest == time_to:
+            # a whole page published within one minute, time_to cannot go further back
+            logger.warning("News for %s truncated at %s, dropping the older articles", symbols, oldest)
+            return feed, True
+        time_to = oldest
+    logger.warning("News for %s still truncated after %d pages of %d, dropping the oldest", symbols, max_pages, limit)
+    return feed, True
+
+def get_incremental_news(symbols: List[str], config: dict) -> Dict[str, dict]:
+    """
+    Fetch, in a single request (paged if needed), only the articles published
+    since the last fetch for `symbols`, store them per ticker, and split each
+    symbol's window into fresh articles and an aggregate of the ones already
+    seen in previous cycles
+    """
+    store = NewsStore(config.get('store', 'news.db'))
+    tickers = {symbol: news_ticker(symbol) for symbol in symbols}
+    now = int(time.time())
+    since = (datetime.utcnow() - timedelta(days=config['offset'])).strftime(NEWS_TIME_FORMAT)
+    max_pages = config.get('max_pages', 3)
+
+    def window_start(symbols: List[str]) -> str:
+        last_fetches = [store.last_fetch(tickers[symbol]) for symbol in symbols]
+        if None in last_fetches:
+            return since
+        # overlap by an hour so late-indexed articles are not missed
+        last = datetime.utcfromtimestamp(min(last_fetches) - 3600).strftime(NEWS_TIME_FORMAT)
+        return max(since, last)
+
+    limit = min(config['limit'] * len(symbols), NEWS_MAX_LIMIT)
+    feed, ok = get_news_window(symbols, window_start(symbols), limit, max_pages)
+    feeds = {symbol: (feed, ok) for symbol in symbols}
+    if len(symbols) > 1 and ok:
+        # the shared topic query can miss the smaller coins altogether
+        for symbol, ticker in tickers.items():
+            if not any(x.get('ticker') == ticker for article in feed for x in article.get('ticker_sentiment', [])):
+                logger.info("No %s article in the shared news feed, fetching it alone", ticker)
+                feeds[symbol] = get_news_window([symbol], window_start([symbol]), config['limit'], max_pages)
+
+    news = {}
+    for symbol, ticker in tickers.items():
+        feed, ok = feeds[symbol]
+        fresh = store.update(ticker, feed)[:config['limit']]
+        if ok:
+            store.record_fetch(ticker, now)
+        logger.info("News for %s: %d fresh of %d fetched", symbol, len(fresh), len(feed))
+        news[symbol] = {
+            'new_articles': [{k: v for k, v in x.items() if k != 'key'} for x in fresh],
+            'previously_seen': store.aggregate(ticker, since, exclude=[x['key'] for x in fresh]),
+        }
+    store.prune(since)
+    return news
+
 def fetch_fear_and_greed_index(days=7):
     url = f"https://api.alternative.me/fng/?limit={days}&format=json"
     
@@ -37,6 +131,7 @@ def fetch_fear_and_greed_index(days=7):
     }
 
 def get_google_trends(symbol, days=7):
+    # from pytrends.request import TrendReq
     # pytrends = TrendReq()
     # pytrends.build_payload(kw_list=[symbol], timeframe=f"now {days}-d", geo="US")
 
@@ -44,19 +139,39 @@ def get_google_trends(symbol, days=7):
     data = []
     return data
 
-def sentimental_analysis(target: str, config: dict) -> SentimentalAnalysis:
+def fetch_sentiment_data(targets: List[str], config: dict) -> Dict[str, dict]:
+    """
+    Fetch the sentiment inputs of every target at once: one news request for
+    all targets, split by ticker, and one fear & greed fetch shared by everyone
+    """
+    news = get_incremental_news(targets, config['news'])
+    fear_and_greed_index = fetch_fear_and_greed_index(config['fear_and_greed_index'])
+    # google_trends = get_google_trends(NAMES[target])
+    return {
+        target: {
+            'news_sentiment': news[target],
+            'fear_and_greed_index': fear_and_greed_index,
+        }
+        for target in targets
+    }
+
+def sentimental_analysis(target: str, config: dict, data: Optional[dict] = None) -> SentimentalAnalysis:
     logger.info("Starting sentimental analysis for %s", target)
 
-    news_sentiment = get_news_sentiment(target)
-    fear_and_greed_index = fetch_fear_and_greed_index()
-    # google_trends = get_google_trends(NAMES[target])
+    if data is None:
+        data = fetch_sentiment_data([target], config)[target]
+    news_sentiment = data['news_sentiment']
+    fear_and_greed_index = data['fear_and_greed_index']
+
+    from langchain_core.messages import HumanMessage, SystemMessage
 
     model = get_llm(config['llm']['model'])
     user_prompt = f"""
         DATE: {datetime.now().strftime("%d-%m-%Y")}
         Target Cryptocurrency: {target}
 
-        News Sentiment: {news_sentiment}
+        News Sentiment (new or changed since the last analysis): {news_sentiment['new_articles']}
+        News Sentiment (aggregate of articles already analysed, last {config['news']['offset']} days): {news_sentiment['previously_seen']}
         Fear and Greed Index: {fear_and_greed_index}
     """
     messages = [
@@ -1,23 +1,33 @@
 import os
 import time
 import json
-import talib
 import requests
 import numpy as np
 from typing import Optional
 from datetime import datetime
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from binance import Client
-
 from src.prompts import technical_analysis_system_prompt
-from src.schemas import TechnicalAnalysis
+from src.schemas import Series, TechnicalData, TechnicalAnalysis
 from src.utils import get_llm
 
 from src.logger import setup_logger
 
 logger = setup_logger('technical_analysis', 'project.log')
 
+# column name -> position in a Binance kline
+KLINE_COLUMNS = {
+    'open': 1,
+    'high': 2,
+    'low': 3,
+    'close': 4,
+    'volume': 5,
+    'quote_volume': 7,
+    'trades': 8,
+    'taker_buy_volume': 9,
+    'taker_buy_quote_volume': 10,
+}
+KLINE_FIELDS = 12
+
 def get_ohlcv(
     symbol: int, 
     interval: Optional[str] = '4h', 
@@ -32,8 +42,10 @@ def get_ohlcv(
         limit: int, number of data points to return
         
     Returns:
-        dict: OHLCV data
+        Series: OHLCV data
     """
+    from binance import Client
+
     interval_map = {
         '1h': Client.KLINE_INTERVAL_1HOUR,
         '4h': Client.KLINE_INTERVAL_4HOUR,
@@ -48,37 +60,27 @@ def get_ohlcv(
         interval=interval_map[interval],
         limit=limit
     )
-    return {
-        'open_time': np.array([int(candle[0]) for candle in candles]),
-        'open': np.array([float(candle[1]) for candle in candles]),
-        'high': np.array([float(candle[2]) for candle in candles]),
-        'low': np.array([float(candle[3]) for candle in candles]),
-        'close': np.array([float(candle[4]) for candle in candles]),
-        'volume': np.array([float(candle[5]) for candle in candles]),
-        'quote_volume': np.array([float(candle[7]) for candle in candles]),
-        'trades': np.array([int(candle[8]) for candle in candles]),
-        'taker_buy_volume': np.array([float(candle[9]) for candle in candles]),
-        'taker_buy_quote_volume': np.array([float(candle[10]) for candle in candles])
-    }
+    # parse the whole response in one pass, then keep one row per column
+    raw = np.array(candles, dtype=np.float64).reshape(-1, KLINE_FIELDS)
+    return Series(
+        columns=list(KLINE_COLUMNS),
+        open_time=raw[:, 0].astype(np.int64),
+        values=raw.T.take(list(KLINE_COLUMNS.values()), axis=0)
+    )
 
 def get_indicators(
-    data: dict,
-    **kwargs  # Changed from config: dict to **kwargs
-):
+    data: Series,
+    **kwargs
+) -> Series:
     """
-    Get indicators from data
+    Get indicators from data, see src/indicators.py for the registry.
+    Each keyword is an indicator name mapped to its parameters, or to a list
+    of parameterizations, e.g. EMA=[{'timeperiod': 10}, {'timeperiod': 50}]
     """
-    indicators = {}
-    for key in kwargs:
-        if key == 'EMA':
-            indicators[f'EMA_{kwargs[key]["timeperiod"]}'] = talib.EMA(data['close'], timeperiod=kwargs[key]['timeperiod'])
-        elif key == 'RSI':
-            indicators[f'RSI_{kwargs[key]["timeperiod"]}'] = talib.RSI(data['close'], timeperiod=kwargs[key]['timeperiod'])
-        elif key == 'MACD':
-            indicators[f'MACD_{kwargs[key]["fastperiod"]}_{kwargs[key]["slowperiod"]}_{kwargs[key]["signalperiod"]}'], _, _ = talib.MACD(data['close'], fastperiod=kwargs[key]['fastperiod'], slowperiod=kwargs[key]['slowperiod'], signalperiod=kwargs[key]['signalperiod'])
-        elif key == 'BBANDS':
-            indicators[f'BBANDS_{kwargs[key]["timeperiod"]}'] = talib.BBANDS(data['close'], timeperiod=kwargs[key]['timeperiod'])
-    return indicators
+    # talib is only loaded with the registry
+    from src.indicators import compute_indicators
+
+    return compute_indicators(data, kwargs)
 
 def get_bitcoin_dominance(
     days: int
@@ -102,6 +104,24 @@ def get_bitcoin_dominance(
         'bitcoin_dominance': [float(x['bitcoinDominance']) for x in data],
     }
 
+def history_to_series(
+    history: list,
+    fields: dict
+) -> Series:
+    """
+    Convert a Coinalyze history ({'t': seconds, ...}) to a Series,
+    `fields` maps column names to Coinalyze keys
+    """
+    raw = np.array(
+        [[x['t'], *(x[key] for key in fields.values())] for x in history],
+        dtype=np.float64
+    ).reshape(-1, len(fields) + 1)
+    return Series(
+        columns=list(fields),
+        open_time=raw[:, 0].astype(np.int64) * 1000,
+        values=raw[:, 1:].T
+    )
+
 def get_derivative_data(
     symbol: str,
     config: dict,
@@ -126,63 +146,72 @@ def get_derivative_data(
         url_open_interest = "https://api.coinalyze.net/v1/open-interest-history"
         response = requests.get(url_open_interest, params=params)
         open_interest = response.json()
-        derivative['open_interest'] = {
-            'open_time': [int(x['t']) * 1000 for x in open_interest[0]['history']],
-            'open': [float(x['o']) for x in open_interest[0]['history']],
-            'high': [float(x['h']) for x in open_interest[0]['history']],
-            'low': [float(x['l']) for x in open_interest[0]['history']],
-            'close': [float(x['c']) for x in open_interest[0]['history']],
-        }
+        derivative['open_interest'] = history_to_series(
+            open_interest[0]['history'],
+            {'open': 'o', 'high': 'h', 'low': 'l', 'close': 'c'}
+        )
 
 
     if 'funding_rate' in config['indicators']:
         url_funding_rate = "https://api.coinalyze.net/v1/funding-rate-history"
         response = requests.get(url_funding_rate, params=params)
         funding_rate = response.json()
-        derivative['funding_rate'] = {
-            'open_time': [int(x['t']) * 1000 for x in funding_rate[0]['history']],
-            'open': [float(x['o']) for x in funding_rate[0]['history']],
-            'high': [float(x['h']) for x in funding_rate[0]['history']],
-            'low': [float(x['l']) for x in funding_rate[0]['history']],
-            'close': [float(x['c']) for x in funding_rate[0]['history']],
-        }
+        derivative['funding_rate'] = history_to_series(
+            funding_rate[0]['history'],
+            {'open': 'o', 'high': 'h', 'low': 'l', 'close': 'c'}
+        )
 
     if 'liquidation' in config['indicators']:
         url_liquidation = "https://api.coinalyze.net/v1/liquidation-history"
         response = requests.get(url_liquidation, params=params)
         liquidation = response.json()
-        derivative['liquidation'] = {
-            'open_time': [int(x['t']) * 1000 for x in liquidation[0]['history']],
-            'long': [float(x['l']) for x in liquidation[0]['history']],
-            'short': [float(x['s']) for x in liquidation[0]['history']],
-        }
+        derivative['liquidation'] = history_to_series(
+            liquidation[0]['history'],
+            {'long': 'l', 'short': 's'}
+        )
 
     if 'long_short_ratio' in config['indicators']:
         params['indicators'] = 'long_short_ratio'
         url_long_short_ratio = "https://api.coinalyze.net/v1/long-short-ratio-history"
         response = requests.get(url_long_short_ratio, params=params)
         long_short_ratio = response.json()
-        derivative['long_short_ratio'] = {
-            'open_time': [int(x['t']) * 1000 for x in long_short_ratio[0]['history']],
-            'ratio': [float(x['r']) for x in long_short_ratio[0]['history']],
-            'long': [float(x['l']) for x in long_short_ratio[0]['history']],
-            'short': [float(x['s']) for x in long_short_ratio[0]['history']],
-        }
+        derivative['long_short_ratio'] = history_to_series(
+            long_short_ratio[0]['history'],
+            {'ratio': 'r', 'long': 'l', 'short': 's'}
+        )
     
     return derivative 
 
-def technical_analysis(
+def get_technical_data(
     target: str,
     config: dict
+) -> TechnicalData:
+    """
+    Fetch the market data the technical analysis is based on
+    """
+    ohlcv = get_ohlcv(target, config['data']['interval'], config['data']['lookback'])
+    return TechnicalData(
+        ohlcv=ohlcv,
+        indicators=get_indicators(ohlcv, **config['indicators']),
+        derivative=get_derivative_data(target, config['derivative']),
+        bitcoin_dominance=get_bitcoin_dominance(config['bitcoin_dominance']['days'])
+    )
+
+def technical_analysis(
+    target: str,
+    config: dict,
+    data: Optional[TechnicalData] = None
 ) -> TechnicalAnalysis:
     """
     Perform technical analysis on the target cryptocurrency
     """
     logger.info("Starting technical analysis for %s", target)
-    ohlcv = get_ohlcv(target, config['data']['interval'], config['data']['lookback'])
-    indicators = get_indicators(ohlcv, **config['indicators'])
-    bitcoin_dominance = get_bitcoin_dominance(config['bitcoin_dominance']['days'])
-    derivative = get_derivative_data(target, config['derivative'])
+    if data is None:
+        data = get_technical_data(target, config)
+    ohlcv = data.ohlcv
+    indicators = data.indicators
+    bitcoin_dominance = data.bitcoin_dominance
+    derivative = data.derivative
 
     user_prompt = f"""
     DATE: {datetime.now().strftime("%d-%m-%Y")}
@@ -201,20 +230,22 @@ def technical_analysis(
     user_prompt += f"""
     Technical Indicators:
     """
-    for key in indicators:
+    for key in indicators.columns:
         user_prompt += f"- {key}: {indicators[key]}"    
     
     user_prompt += f"""
     Derivative Market Data (last {config['derivative']['lookback']} in {config['derivative']['interval']} interval):
     """
     for key in derivative:
-        user_prompt += f"- {key}: {json.dumps(derivative[key])}"
+        user_prompt += f"- {key}: {json.dumps(derivative[key].to_dict())}"
     
     user_prompt += f"""
     Bitcoin Dominance (last {config['bitcoin_dominance']['days']} days):
     - {bitcoin_dominance['date']}: {bitcoin_dominance['bitcoin_dominance']}
     """
     
+    from langchain_core.messages import HumanMessage, SystemMessage
+
     llm = get_llm(config['llm']['model'])
     
     try:
@@ -228,13 +259,9 @@ def technical_analysis(
 
     logger.info(f"Finished technical analysis for {target}")
 
-    _indicators = {}
-    for key in indicators:
-        _indicators[key] = indicators[key]
-
     return TechnicalAnalysis(
         ohlcv=ohlcv,
-        indicators=_indicators,
+        indicators=indicators,
         summary=summary.content
     )
 
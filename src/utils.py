@@ -7,9 +7,8 @@ import urllib.parse
 import requests
 from typing import Optional
 
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from dotenv import load_dotenv  
+from dotenv import load_dotenv
+# the only load_dotenv() call, every entry point imports src.utils before reading the environment
 load_dotenv()
 
 NAMES = {
@@ -24,6 +23,17 @@ TRADING_FEE = {
     "taker": 0.1
 }
 
+QUOTE_ASSETS = ("USDT", "USDC", "FDUSD", "BTC", "ETH", "BNB")
+
+def base_asset(symbol: str) -> str:
+    """
+    Strip the quote asset from a trading pair, e.g. SOLUSDT -> SOL
+    """
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)]
+    return symbol
+
 BINANCE_BASE_URL = os.getenv('BINANCE_BASE_URL')
 API_CLIENT = os.getenv('BINANCE_CLIENT_ID')
 API_SECRET = os.getenv('BINANCE_CLIENT_SECRET')
@@ -60,13 +70,33 @@ def get_current_portfolio(symbols):
     response = requests.get(url, headers=headers, params=params)
     balances = response.json()['balances']
 
-    symbols = set(x[:3] for x in symbols) | {'USDT'}
+    symbols = set(base_asset(x) for x in symbols) | {'USDT'}
     return {
         balance['asset']: round(float(balance['free']), 4)
         for balance in balances
         if balance['asset'] in symbols
     }
 
+def get_open_orders():
+    endpoint = "/api/v3/openOrders"
+    url = f"{BINANCE_BASE_URL}{endpoint}"
+
+    timestamp = int(time.time() * 1000)
+
+    params = {
+        "timestamp": timestamp,
+    }
+    query_string = urllib.parse.urlencode(params)
+    signature = hmac.new(API_SECRET.encode(), query_string.encode(), hashlib.sha256).hexdigest()
+    params["signature"] = signature
+
+    headers = {
+        "X-MBX-APIKEY": API_CLIENT
+    }
+
+    response = requests.get(url, headers=headers, params=params)
+    return response.json()
+
 def create_market_order(
     symbol: str,
     quantity: float,
@@ -201,27 +231,9 @@ def cancel_order(symbol, order_id):
     response = requests.delete(url, headers=headers, params=params)
 
 
-def clear_orders():
-    endpoint = "/api/v3/openOrders"
-    url = f"{BINANCE_BASE_URL}{endpoint}"
-
-    timestamp = int(time.time() * 1000)
-
-    params = {
-        "timestamp": timestamp,
-    }
-    query_string = urllib.parse.urlencode(params)
-    signature = hmac.new(API_SECRET.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-    params["signature"] = signature
-
-    headers = {
-        "X-MBX-APIKEY": API_CLIENT
-    }
-
-    response = requests.get(url, headers=headers, params=params)
-    print(response)
-    orders = response.json()
-    
+def clear_orders(orders: Optional[list] = None):
+    if orders is None:
+        orders = get_open_orders()
 
     if len(orders) == 0:
         return
@@ -239,17 +251,21 @@ def get_llm(
     model: str,
     config: Optional[dict] = None
 ):
+    # provider packages are imported on demand, only the backend in use is loaded
     if model == 'gpt-4o' or model== 'o1-2024-12-17' or model == 'gpt-4o-mini':
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(model=model,
                           api_key=os.getenv('OPENAI_API_KEY'),
         )
     elif model == 'deepseek-chat' or model == 'deepseek-reasoner':
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model=model,
             base_url="https://api.deepseek.com",
             api_key=os.getenv('DEEPSEEK_API_KEY')
         )
     elif 'gemini' in model: # gemini-2.0-flash-thinking-exp-01-21 or gemini-2.0-pro-exp-02-05
+        from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(model=model,
                                     google_api_key=os.getenv('GEMINI_API_KEY'),
                                     temperature=0
@@ -0,0 +1,218 @@
+import os
+import time
+import zlib
+import socket
+import asyncio
+import sqlite3
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from src.journal import RunJournal, journal_path
+from src.schemas import Report, SentimentalAnalysis, TechnicalAnalysis
+from src.pipeline import generate_reports, run_sentiment_data
+
+from src.logger import setup_logger
+
+logger = setup_logger('workers', 'project.log')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    cycle TEXT,
+    target TEXT,
+    shard INTEGER,
+    status TEXT,
+    worker TEXT,
+    error TEXT,
+    updated INTEGER,
+    PRIMARY KEY (cycle, target)
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (status, shard);
+"""
+
+def shard_of(target: str, shards: int) -> int:
+    """
+    Stable hash partition of a target (unlike hash(), identical across processes)
+    """
+    return zlib.crc32(target.encode()) % shards
+
+def partition(targets: List[str], shards: int) -> List[List[str]]:
+    parts = [[] for _ in range(shards)]
+    for target in targets:
+        parts[shard_of(target, shards)].append(target)
+    return [part for part in parts if part]
+
+class TaskQueue:
+    """
+    SQLite task queue shared by the coordinator and the worker nodes
+    """
+    def __init__(self, path: str = 'queue.db'):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, cycle: str, targets: List[str], shards: int):
+        """
+        Queue the targets of a cycle, keeping the ones already done so that a
+        rerun of the cycle only redistributes the unfinished targets
+        """
+        now = int(time.time())
+        with self._connect() as conn:
+            for target in targets:
+                conn.execute(
+                    """INSERT INTO tasks VALUES (?, ?, ?, 'pending', NULL, NULL, ?)
+                    ON CONFLICT(cycle, target) DO UPDATE SET
+                        shard = excluded.shard,
+                        status = 'pending',
+                        worker = NULL,
+                        error = NULL,
+                        updated = excluded.updated
+                    WHERE tasks.status != 'done'""",
+                    (cycle, target, shard_of(target, shards), now)
+                )
+
+    def claim(self, shard: int, worker: str, lease: int = 900) -> Optional[tuple]:
+        """
+        Take the oldest pending task of `shard`, or a running one whose worker
+        has held it for more than `lease` seconds (presumably dead)
+        """
+        now = int(time.time())
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """SELECT cycle, target, status, worker FROM tasks
+                WHERE shard = ? AND (status = 'pending' OR (status = 'running' AND updated < ?))
+                ORDER BY updated LIMIT 1""",
+                (shard, now - lease)
+            ).fetchone()
+            if row is not None:
+                if row[2] == 'running':
+                    logger.warning("Lease of %s on %s %s expired, reclaiming", row[3], row[0], row[1])
+                conn.execute(
+                    "UPDATE tasks SET status = 'running', worker = ?, updated = ? WHERE cycle = ? AND target = ?",
+                    (worker, now, row[0], row[1])
+                )
+        return row[:2] if row is not None else None
+
+    def finish(self, cycle: str, target: str, error: Optional[str] = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, updated = ? WHERE cycle = ? AND target = ?",
+                ('failed' if error else 'done', error, int(time.time()), cycle, target)
+            )
+
+    def unfinished(self, cycle: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE cycle = ? AND status IN ('pending', 'running')",
+                (cycle,)
+            ).fetchone()
+        return row[0]
+
+def analyse_shard(targets: List[str], config: dict, journal: RunJournal, cycle: str) -> List[Report]:
+    """
+    Entry point of a worker process: analyse its share of the targets
+    """
+    logger.info("Worker %s analysing %s", os.getpid(), targets)
+    return asyncio.run(generate_reports(targets, config, journal, cycle))
+
+def journaled_reports(targets: List[str], journal: RunJournal, cycle: str) -> List[Report]:
+    """
+    Gather the reports the workers left in the journal
+    """
+    reports = []
+    for target in targets:
+        tech = journal.get(cycle, target, 'technical_analysis')
+        sent = journal.get(cycle, target, 'sentimental_analysis')
+        if tech is None or sent is None:
+            logger.error("No analysis for %s in cycle %s", target, cycle)
+            continue
+        reports.append(Report(
+            name=target,
+            technical_analysis=TechnicalAnalysis.model_validate(tech),
+            sentimental_analysis=SentimentalAnalysis.model_validate(sent)
+        ))
+    return reports
+
+def distributed_reports(
+    targets: List[str],
+    config: dict,
+    journal: RunJournal,
+    cycle: str
+) -> List[Report]:
+    """
+    Coordinator: generate the reports in this process (mode `local`), across
+    worker processes (mode `process`) or across worker nodes polling a shared
+    SQLite queue (mode `queue`)
+    """
+    workers = config.get('workers', {})
+    mode = workers.get('mode', 'local')
+    shards = workers.get('processes', os.cpu_count() or 1)
+    if mode == 'local' or len(targets) <= 1:
+        return asyncio.run(generate_reports(targets, config, journal, cycle))
+
+    # the batched sentiment fetch happens once here, workers read it from the journal
+    try:
+        run_sentiment_data(targets, config, journal, cycle)
+    except Exception as e:
+        logger.error("Error fetching sentiment data: %s", e)
+
+    if mode == 'process':
+        reports = {}
+        with ProcessPoolExecutor(max_workers=shards) as executor:
+            futures = [
+                executor.submit(analyse_shard, part, config, journal, cycle)
+                for part in partition(targets, shards)
+            ]
+            for future in futures:
+                try:
+                    reports.update({report.name: report for report in future.result()})
+                except Exception as e:
+                    logger.error("Worker process failed: %s", e)
+        return [reports[target] for target in targets if target in reports]
+
+    if mode == 'queue':
+        queue = TaskQueue(workers.get('queue', 'queue.db'))
+        queue.enqueue(cycle, targets, shards)
+        deadline = time.time() + workers.get('timeout', 3600)
+        while queue.unfinished(cycle) and time.time() < deadline:
+            time.sleep(workers.get('poll', 5))
+        if queue.unfinished(cycle):
+            logger.error("Timed out waiting for %d targets in cycle %s", queue.unfinished(cycle), cycle)
+        return journaled_reports(targets, journal, cycle)
+
+    raise ValueError(f'Worker mode {mode} not found')
+
+def run_worker(config: dict, shard: int, once: bool = False):
+    """
+    Worker node: claim the queued targets of `shard` and journal their analyses
+    """
+    workers = config.get('workers', {})
+    queue = TaskQueue(workers.get('queue', 'queue.db'))
+    journal = RunJournal(journal_path(config))
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Worker %s serving shard %d", worker, shard)
+
+    while True:
+        task = queue.claim(shard, worker, workers.get('lease', 900))
+        if task is None:
+            if once:
+                return
+            time.sleep(workers.get('poll', 5))
+            continue
+        cycle, target = task
+        try:
+            reports = asyncio.run(generate_reports([target], config, journal, cycle))
+            queue.finish(cycle, target, None if reports else "analysis failed")
+        except Exception as e:
+            logger.error("Error analysing %s: %s", target, e)
+            queue.finish(cycle, target, str(e))